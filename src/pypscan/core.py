@@ -1,58 +1,326 @@
 import re
 import os
 import warnings
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
 
 from .utils import SKDict
 
+# Compiled patterns are cached by pattern string: rescan/refresh and
+# notebook re-runs construct Scanners with the same regex over and over.
+_compile_cached = lru_cache(maxsize=128)(re.compile)
+
+# Completed scans keyed by (base_path, pattern). A cached result is reused
+# while the mtimes of base_path and its first-level subdirectories are
+# unchanged, which covers the common no-change rescan in notebooks.
+_scan_cache: dict = {}
+_SCAN_CACHE_MAX = 16
+
+
+def _compile_name_prefilter(pattern: str):
+    """
+    Compile the filename tail of *pattern* (after its last unescaped ``/``)
+    into a cheap prefilter to run against entry names before building the
+    full path. Returns None when no sound prefilter can be derived: the
+    pattern must be end-anchored (``$``/``\\Z``) — with unanchored search
+    a match may end inside a directory component, where the tail never
+    has to match the entry name — the tail must compile on its own, and
+    it must not be able to match a path separator (``.``, ``\\D``,
+    ``\\W``, ``\\S`` and negated classes all can).
+    """
+    if pattern.endswith("$"):
+        stem = pattern[:-1]
+    elif pattern.endswith(r"\Z"):
+        stem = pattern[:-2]
+    else:
+        return None
+    # An odd run of backslashes before the anchor means it is escaped
+    # ("\$" literal dollar) or broken ("\\Z" literal backslash + Z).
+    if (len(stem) - len(stem.rstrip("\\"))) % 2:
+        return None
+    in_class = False
+    last_slash = -1
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            # ``\/`` outside a class is a separator, same as bare ``/``.
+            if not in_class and pattern[i + 1:i + 2] == "/":
+                last_slash = i + 1
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "/":
+            last_slash = i
+        i += 1
+    if last_slash < 0:
+        return None
+    tail = pattern[last_slash + 1:]
+    in_class = False
+    i = 0
+    while i < len(tail):
+        char = tail[i]
+        if char == "\\":
+            # ``\/`` in the tail means the tail matches across a
+            # separator and can never match a bare entry name.
+            if tail[i + 1:i + 2] in ("D", "W", "S", "/"):
+                return None
+            i += 2
+            continue
+        if in_class:
+            if char == "/":
+                return None
+            in_class = char != "]"
+        elif char == "[":
+            if tail[i + 1:i + 2] == "^":
+                return None
+            in_class = True
+        elif char == ".":
+            return None
+        i += 1
+    try:
+        return re.compile(tail)
+    except re.error:
+        return None
+
+
+def _pattern_depth(pattern: str):
+    """
+    Number of literal ``/`` separators in *pattern* (outside character
+    classes), or None when the pattern's depth is unbounded. Used to prune
+    traversal below the deepest directory level the pattern addresses.
+
+    Patterns are applied with unanchored ``search``, so an unanchored
+    pattern with N slashes still matches files at any depth >= N; only a
+    start-anchored pattern (``^``/``\\A``) pins its slash count to the
+    depth below base_path. Alternation may hide differing slash counts
+    and also disables pruning.
+    """
+    if not pattern.startswith(("^", r"\A")):
+        return None
+    in_class = False
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            # ``\/`` is the same separator match as ``/`` to the engine
+            # (PCRE-style patterns escape every slash).
+            if pattern[i + 1:i + 2] == "/":
+                if in_class:
+                    return None
+                depth += 1
+            i += 2
+            continue
+        if in_class:
+            # A class containing ``/`` can match a separator or not, so
+            # the slash count is ambiguous; do not prune.
+            if char == "/":
+                return None
+            in_class = char != "]"
+        elif char == "|":
+            return None
+        elif char == "[":
+            in_class = True
+        elif char == "/":
+            depth += 1
+        i += 1
+    return depth
+
 
 class Scanner:
     """Walks a directory tree and extracts parametric file paths via a regex."""
 
     def __init__(self, regex: str, base_path: str = "./"):
-        if not re.compile(regex).groupindex:
+        self._regex = _compile_cached(regex)
+        if not self._regex.groupindex:
             warnings.warn(
                 "Regex has no named groups. Use (?P<name>...) to define parameters.",
                 UserWarning,
                 stacklevel=2,
             )
-        self._regex = re.compile(regex)
+        self._name_prefilter = _compile_name_prefilter(regex)
+        self._max_depth = _pattern_depth(regex)
+        # Group names in index order, resolved once: groupdict() walks the
+        # pattern's name->index map on every match, which adds up on scans
+        # with many hits.
+        groupindex = self._regex.groupindex
+        self._group_names = tuple(sorted(groupindex, key=groupindex.get))
+        self._group_indices = tuple(groupindex[name] for name in self._group_names)
         self.base_path = base_path
+        # Offset of the base-relative part in absolute paths; the regex is
+        # matched against that part only, so the engine never scans the
+        # base prefix for match starts.
+        self._rel_start = len(base_path.rstrip(os.sep) or os.sep) + 1
+
+    def _scan_dir(self, directory: str, depth: int) -> tuple:
+        """
+        Scan a single directory at *depth* below base_path and return
+        (subdirs, matches). Subdirectories deeper than the pattern's slash
+        count are pruned: the pattern cannot address files below them.
+
+        Explicit scandir instead of os.walk: DirEntry.is_dir() uses the
+        d_type cached by readdir (no extra stat syscall with
+        follow_symlinks=False), and prefixing the parent path once per
+        directory avoids an os.path.join per file.
+        """
+        prefix = directory + os.sep
+        rel_dir = directory[self._rel_start:]
+        rel_prefix = rel_dir + os.sep if rel_dir else ""
+        subdirs: list = []
+        matches: list = []
+        prefilter = self._name_prefilter
+        descend = self._max_depth is None or depth < self._max_depth
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            # Unreadable directory; os.walk skipped these silently too.
+            return subdirs, matches
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if descend:
+                        subdirs.append(prefix + entry.name)
+                    continue
+                # Cheap filename check first; only matching names pay
+                # for the path concatenation and the full regex.
+                if prefilter is not None and prefilter.search(entry.name) is None:
+                    continue
+                match = self._regex.search(rel_prefix + entry.name)
+                if match is not None:
+                    # Grab the stat while the entry is at hand so viewers can
+                    # show size/mtime later without another syscall.
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        stat = None
+                    matches.append((match, stat))
+        return subdirs, matches
+
+    def _scan_signature(self):
+        """
+        Cheap change signature: mtimes of base_path and its first-level
+        subdirectories. None disables caching (e.g. unreadable base).
+        """
+        base = self.base_path.rstrip(os.sep) or os.sep
+        try:
+            subdirs = []
+            with os.scandir(base) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(
+                            (entry.name, entry.stat(follow_symlinks=False).st_mtime_ns)
+                        )
+            subdirs.sort()
+            return (os.stat(base).st_mtime_ns, tuple(subdirs))
+        except OSError:
+            return None
 
     def scan(self) -> SKDict:
-        """Walk base_path and return an SKDict mapping param dicts -> file paths."""
+        """
+        Walk base_path and return an SKDict mapping param dicts -> file paths.
+
+        Results are cached per (base_path, pattern) and reused while the
+        top-level directory mtimes are unchanged, so repeat scans of an
+        untouched tree skip the walk entirely. The signature does not see
+        changes below the first level — use :meth:`rescan` to pick those
+        up. Cache hits hand the same SKDict instance to every caller;
+        treat scan results as read-only.
+        """
+        cache_key = (self.base_path, self._regex.pattern)
+        signature = self._scan_signature()
+        if signature is not None:
+            cached = _scan_cache.get(cache_key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+        return self._scan_and_cache(signature)
+
+    def _scan_and_cache(self, signature) -> SKDict:
+        """Walk unconditionally and replace the cache entry."""
+        skdict = self._scan()
+        if signature is not None:
+            cache_key = (self.base_path, self._regex.pattern)
+            if cache_key not in _scan_cache and len(_scan_cache) >= _SCAN_CACHE_MAX:
+                _scan_cache.pop(next(iter(_scan_cache)))
+            _scan_cache[cache_key] = (signature, skdict)
+        return skdict
+
+    def _scan(self) -> SKDict:
+        """Uncached scan of base_path."""
         skdict = SKDict()
+        skdict.param_names = self._group_names
+        skdict.stats = {}
         warned_empty = False
-        for root, _dirs, files in os.walk(self.base_path):
-            for file in files:
-                path = os.path.join(root, file)
-                match = self._regex.search(path)
-                if match is None:
-                    continue
-                groups = match.groupdict()
-                if not groups:
-                    if not warned_empty:
-                        warnings.warn(
-                            "Regex matched but produced no named groups; skipping.",
-                            UserWarning,
-                            stacklevel=2,
-                        )
-                        warned_empty = True
-                    continue
-                key = frozenset(groups.items())
-                if key in skdict:
-                    warnings.warn(
-                        f"Duplicate parameter combination {dict(groups)!r}; "
-                        f"overwriting previous entry.",
-                        UserWarning,
-                        stacklevel=2,
-                    )
-                skdict[groups] = path
+        names = self._group_names
+        indices = self._group_indices
+        base = self.base_path.rstrip(os.sep) or os.sep
+        base_prefix = base + os.sep
+        # Directories are scanned concurrently: scandir and the compiled
+        # regex both release the GIL, so threads overlap readdir latency —
+        # the win grows with syscall cost (network filesystems especially).
+        # Matches are merged in the main thread, keeping SKDict and the
+        # warning bookkeeping single-threaded.
+        with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 4) as executor:
+            pending = {executor.submit(self._scan_dir, base, 0): 1}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    child_depth = pending.pop(future)
+                    subdirs, matches = future.result()
+                    for subdir in subdirs:
+                        pending[
+                            executor.submit(self._scan_dir, subdir, child_depth)
+                        ] = child_depth + 1
+                    for match, stat in matches:
+                        if not names:
+                            if not warned_empty:
+                                warnings.warn(
+                                    "Regex matched but produced no named groups; "
+                                    "skipping.",
+                                    UserWarning,
+                                    stacklevel=2,
+                                )
+                                warned_empty = True
+                            continue
+                        # match.group with several indices returns the value
+                        # tuple in a single C call.
+                        if len(indices) > 1:
+                            values = match.group(*indices)
+                        else:
+                            values = (match.group(indices[0]),)
+                        # Build the frozenset key directly from the value
+                        # tuple; the (name, value) dict is only materialized
+                        # for the duplicate warning.
+                        key = frozenset(zip(names, values))
+                        if key in skdict:
+                            warnings.warn(
+                                f"Duplicate parameter combination "
+                                f"{dict(zip(names, values))!r}; "
+                                f"overwriting previous entry.",
+                                UserWarning,
+                                stacklevel=2,
+                            )
+                        # match.string is the base-relative path.
+                        path = base_prefix + match.string
+                        skdict[key] = path
+                        if stat is not None:
+                            skdict.stats[path] = stat
         return skdict
 
     def rescan(self) -> SKDict:
-        """Re-run the scan (picks up added/removed files)."""
-        return self.scan()
+        """
+        Re-run the scan unconditionally (picks up added/removed files).
+
+        The mtime signature only watches base_path and its first-level
+        subdirectories, so a file landing deeper in the tree — the usual
+        reason to rescan — does not invalidate the cache. rescan always
+        walks and stores the fresh result for subsequent scan() calls.
+        """
+        return self._scan_and_cache(self._scan_signature())
 
 
 class ParametricIndex:
@@ -62,7 +330,7 @@ class ParametricIndex:
 
     def __init__(self, skdict: SKDict):
         self._skdict = skdict
-        self._cache: dict = {}
+        self._build()
 
     @classmethod
     def from_scan(cls, regex: str, base_path: str = "./") -> "ParametricIndex":
@@ -71,39 +339,125 @@ class ParametricIndex:
 
     def all_params(self) -> list:
         """Return sorted list of all parameter names."""
-        params: set = set()
-        for key in self._skdict.keys():
-            for name, _ in key:
-                params.add(name)
-        return sorted(params)
+        # Scans record their param names on the SKDict; for plain SKDicts
+        # the inverted index already knows the names without another pass
+        # over every entry.
+        names = getattr(self._skdict, "param_names", None)
+        if names is not None:
+            return sorted(names)
+        return list(self._all_options)
+
+    def _build(self):
+        """(Re)build derived lookup state from the underlying SKDict."""
+        # Inverted index: param -> value -> ids of the entries carrying that
+        # pair. Filtering becomes C-level set intersections instead of a
+        # Python loop over every entry per call.
+        by_param_value: dict = {}
+        for entry_id, key in enumerate(self._skdict.keys()):
+            for name, value in key:
+                by_param_value.setdefault(name, {}).setdefault(value, set()).add(
+                    entry_id
+                )
+        self._by_param_value = by_param_value
+        # The full-domain options are what every UI asks for first; compute
+        # them once so get_options() without a selection is a plain lookup.
+        self._all_options = OrderedDict(
+            (name, sorted(values)) for name, values in sorted(by_param_value.items())
+        )
+        # LRU-capped per-selection cache; the previous plain dict grew
+        # without bound under interactive clicking.
+        self._get_options_cached = lru_cache(maxsize=256)(self._compute_options)
+
+    def _selection_mask(self, frozen_selection: frozenset):
+        """Intersect entry-id sets for *frozen_selection*; None means empty."""
+        mask = None
+        for name, value in frozen_selection:
+            ids = self._by_param_value.get(name, {}).get(value)
+            if ids is None:
+                return None
+            mask = ids if mask is None else mask & ids
+            if not mask:
+                return None
+        return mask
+
+    def _compute_options(self, frozen_selection: frozenset) -> dict:
+        mask = self._selection_mask(frozen_selection)
+        result: dict = OrderedDict()
+        if mask is None:
+            return result
+        selected = {name for name, _ in frozen_selection}
+        for name, all_values in self._all_options.items():
+            if name in selected:
+                continue
+            # Walk the presorted full-domain list so order is preserved
+            # without building and re-sorting a value set per call.
+            ids_by_value = self._by_param_value[name]
+            values = [
+                value for value in all_values
+                if not ids_by_value[value].isdisjoint(mask)
+            ]
+            if values:
+                result[name] = values
+        return result
 
     def get_options(self, selection: dict | None = None) -> dict:
         """
         Return {param: sorted([values, ...])} compatible with *selection*.
         If selection is None or empty, returns all options.
         """
-        selection = selection or {}
-        cache_key = frozenset(selection.items())
-        if cache_key in self._cache:
-            return self._cache[cache_key]
-
-        if selection:
-            try:
-                subset = self._skdict[selection]
-            except KeyError:
-                subset = SKDict()
-        else:
-            subset = self._skdict
-
-        opts: dict = defaultdict(set)
-        for key in subset.keys():
-            for name, value in key:
-                opts[name].add(value)
+        if not selection:
+            return self._all_options
+        return self._get_options_cached(frozenset(selection.items()))
 
-        result = OrderedDict(
-            (k, sorted(v)) for k, v in sorted(opts.items())
-        )
-        self._cache[cache_key] = result
+    def cross_filtered_options(self, state: dict | None = None) -> dict:
+        """
+        Return {param: [values valid with all *other* params in *state*
+        fixed]} for every parameter — the cross-filter each UI applies.
+
+        Computed in one pass: the leave-one-out masks for all selected
+        params come from prefix/suffix intersections of their entry-id
+        sets, so the whole map costs O(P) set operations instead of one
+        get_options call (and its own intersections) per parameter.
+        """
+        items = sorted((state or {}).items())
+        empty: frozenset = frozenset()
+        id_sets = [
+            self._by_param_value.get(name, {}).get(value, empty)
+            for name, value in items
+        ]
+        # prefix[i] intersects id_sets[:i], suffix[i] intersects id_sets[i:];
+        # None means "no constraint".
+        prefix = [None]
+        for ids in id_sets:
+            prev = prefix[-1]
+            prefix.append(ids if prev is None else prev & ids)
+        suffix = [None] * (len(items) + 1)
+        for i in range(len(items) - 1, -1, -1):
+            nxt = suffix[i + 1]
+            suffix[i] = id_sets[i] if nxt is None else nxt & id_sets[i]
+
+        position = {name: i for i, (name, _) in enumerate(items)}
+        result: dict = OrderedDict()
+        for name, all_values in self._all_options.items():
+            i = position.get(name)
+            if i is None:
+                mask = prefix[-1]
+            else:
+                left, right = prefix[i], suffix[i + 1]
+                if left is None:
+                    mask = right
+                elif right is None:
+                    mask = left
+                else:
+                    mask = left & right
+            if mask is None:
+                result[name] = list(all_values)
+            else:
+                ids_by_value = self._by_param_value[name]
+                result[name] = [
+                    value for value in all_values
+                    if not ids_by_value[value].isdisjoint(mask)
+                ]
         return result
 
     def resolve(self, selection: dict):
@@ -114,11 +468,17 @@ class ParametricIndex:
         """
         return self._skdict[selection]
 
+    def stat(self, path: str):
+        """Return the stat result recorded for *path* during the scan, if any."""
+        return getattr(self._skdict, "stats", {}).get(path)
+
     def invalidate_cache(self):
-        self._cache.clear()
+        self._build()
 
     def refresh(self, regex: str, base_path: str):
         """Re-scan and rebuild the index."""
+        # rescan, not scan: refresh exists to pick up changes the scan
+        # cache's shallow mtime signature cannot see.
         scanner = Scanner(regex, base_path)
-        self._skdict = scanner.scan()
+        self._skdict = scanner.rescan()
         self.invalidate_cache()
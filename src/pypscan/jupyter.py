@@ -6,6 +6,13 @@ import ipywidgets as widgets
 
 from .core import Scanner, ParametricIndex
 
+# Extension dispatch tables: lowercasing just the extension and testing set
+# membership beats running str.lower plus chained endswith over the full
+# path on every displayed file.
+_TEXT_EXTS = frozenset({".txt"})
+_IMAGE_EXTS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp"})
+_WAND_EXTS = frozenset({".tiff", ".pdf"})
+
 
 class JupyterPScan:
     """
@@ -78,24 +85,21 @@ class JupyterPScan:
         Display the file at *path*.  Override to support additional formats.
         """
         try:
-            lower = path.lower()
-            if lower.endswith(".txt"):
+            ext = os.path.splitext(path)[1].lower()
+            if ext in _TEXT_EXTS:
                 with open(path, "r", encoding="utf-8", errors="replace") as f:
                     display(f.read())
-            elif lower.endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")):
+            elif ext in _IMAGE_EXTS:
                 # IPython handles these formats natively — no extra deps needed.
                 from IPython.display import Image as IImage
                 display(IImage(filename=path))
-            elif lower.endswith((".tiff", ".pdf")):
+            elif ext in _WAND_EXTS:
                 # TIFF and PDF need wand for conversion to a displayable format.
                 try:
                     from wand.image import Image as WImage
                     display(WImage(filename=path))
                 except ImportError:
-                    print(
-                        f"Install 'wand' to display "
-                        f"{os.path.splitext(path)[1]} files.\nPath: {path}"
-                    )
+                    print(f"Install 'wand' to display {ext} files.\nPath: {path}")
             else:
                 print(f"Unsupported file type: {path}")
         except FileNotFoundError:
@@ -121,12 +125,8 @@ class JupyterPScan:
             for key, values in options.items()
         }
 
-    def _current_selection(self, exclude: str | None = None) -> dict:
-        return {
-            k: ctrl.value
-            for k, ctrl in self._controls.items()
-            if k != exclude
-        }
+    def _current_selection(self) -> dict:
+        return {k: ctrl.value for k, ctrl in self._controls.items()}
 
     def _show_current(self):
         """Resolve the current selection and display the file."""
@@ -149,11 +149,11 @@ class JupyterPScan:
 
     def _update_options(self, _change):
         """Recompute available options for each control based on the others."""
+        # One batch call instead of one exclusion dict + query per control.
+        all_options = self._index.cross_filtered_options(self._current_selection())
         for key, control in self._controls.items():
             current_value = control.value
-            selection = self._current_selection(exclude=key)
-            options_map = self._index.get_options(selection)
-            new_options = options_map.get(key, [current_value])
+            new_options = all_options.get(key, [current_value])
             if not new_options:
                 continue
             control.options = new_options
@@ -27,6 +27,49 @@ from .core import Scanner, ParametricIndex
 # Image rendering via Pillow (optional)
 # ---------------------------------------------------------------------------
 
+# Decimal byte values pre-stringified once; the renderers emit one truecolor
+# escape per cell and this avoids a str(int) per channel.
+_BYTE_STR = tuple(map(str, range(256)))
+
+# Extension dispatch tables for the content viewer, built once.
+_IMAGE_EXTS = frozenset({".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".gif", ".webp"})
+_TEXT_EXTS = frozenset({".txt", ""})
+
+# Upper bound on characters read for a text preview; a screenful of lines
+# is taken from this chunk, so a newline-free file cannot be pulled whole.
+_TEXT_PREVIEW_CHARS = 64 * 1024
+
+
+def _ansi_rows_numpy(img) -> list:
+    """
+    Convert an RGB image to one ANSI half-block string per character row.
+
+    NumPy slicing pairs the even/odd pixel rows into (rows, cols, 6) cells
+    in C, so Python only touches each cell once to format its escape code —
+    no per-pixel PIL access and no per-cell Rich objects.
+    """
+    import numpy as np
+
+    arr = np.asarray(img, dtype=np.uint8)
+    if arr.shape[0] % 2:
+        arr = np.vstack([arr, np.zeros((1, arr.shape[1], 3), np.uint8)])
+    cells = np.dstack([arr[0::2], arr[1::2]])
+    byte_str = _BYTE_STR
+    rows = []
+    for row in cells.reshape(cells.shape[0], -1).tolist():
+        it = iter(row)
+        rows.append(
+            "".join(
+                "\x1b[38;2;" + byte_str[r1] + ";" + byte_str[g1] + ";"
+                + byte_str[b1] + ";48;2;" + byte_str[r2] + ";" + byte_str[g2]
+                + ";" + byte_str[b2] + "m▀"
+                for r1, g1, b1, r2, g2, b2 in zip(it, it, it, it, it, it)
+            )
+            + "\x1b[0m"
+        )
+    return rows
+
+
 def _render_image(path: str, width: int):
     """
     Render an image using half-block characters (▀) with 24-bit RGB colours.
@@ -40,8 +83,6 @@ def _render_image(path: str, width: int):
     """
     try:
         from PIL import Image
-        from rich.color import Color
-        from rich.style import Style
         from rich.text import Text
     except ImportError:
         return f"[dim]Install pillow to preview images[/dim]\n{path}"
@@ -50,34 +91,47 @@ def _render_image(path: str, width: int):
         return path
 
     try:
-        img = Image.open(path).convert("RGB")
+        img = Image.open(path)
         img_w, img_h = img.size
+        target_w = min(width, img_w)
+        target_h = max(1, round(img_h * target_w / img_w))
+
+        # For JPEGs, let libjpeg decode at reduced resolution up front —
+        # it skips the IDCT work for pixels we would throw away anyway.
+        if img.format == "JPEG":
+            img.draft("RGB", (target_w, target_h))
+        img = img.convert("RGB")
 
         # Scale down to fit terminal width, never upscale small images.
-        scale = min(1.0, width / img_w)
-        if scale < 1.0:
-            img = img.resize(
-                (max(1, round(img_w * scale)), max(1, round(img_h * scale))),
-                Image.LANCZOS,
-            )
+        # thumbnail() decimates progressively; BILINEAR is plenty at the
+        # huge reduction factors a terminal preview implies, and much
+        # cheaper than LANCZOS.
+        img.thumbnail((target_w, target_h), Image.BILINEAR)
 
+        try:
+            return Text.from_ansi("\n".join(_ansi_rows_numpy(img)), no_wrap=True)
+        except ImportError:
+            pass  # NumPy not installed; fall back to the per-pixel loop.
+
+        # Same ANSI-string strategy as the NumPy path: one escape-coded
+        # string per row instead of a Rich span per cell, which Text.append
+        # would record and the renderer would have to walk again.
         w, h = img.size
         pixels = img.load()
-
-        text = Text(no_wrap=True)
+        byte_str = _BYTE_STR
+        rows = []
         for row in range(0, h, 2):
+            parts = []
             for col in range(w):
                 r1, g1, b1 = pixels[col, row]
                 r2, g2, b2 = pixels[col, row + 1] if row + 1 < h else (0, 0, 0)
-                text.append(
-                    "▀",
-                    style=Style(
-                        color=Color.from_rgb(r1, g1, b1),
-                        bgcolor=Color.from_rgb(r2, g2, b2),
-                    ),
+                parts.append(
+                    "\x1b[38;2;" + byte_str[r1] + ";" + byte_str[g1] + ";"
+                    + byte_str[b1] + ";48;2;" + byte_str[r2] + ";" + byte_str[g2]
+                    + ";" + byte_str[b2] + "m▀"
                 )
-            text.append("\n")
-        return text
+            rows.append("".join(parts) + "\x1b[0m")
+        return Text.from_ansi("\n".join(rows), no_wrap=True)
     except Exception as exc:
         return f"[red]Error rendering image:[/red] {exc}\n{path}"
 
@@ -201,9 +255,14 @@ class _ContentViewer(Static):
     def __init__(self) -> None:
         super().__init__("")
         self._path: str | None = None
+        self._st: os.stat_result | None = None
+        self._ext: str = ""
 
-    def display_path(self, path: str | None) -> None:
+    def display_path(self, path: str | None, st: "os.stat_result | None" = None) -> None:
+        """Show *path*; *st* is an optional scan-time stat that saves a syscall."""
         self._path = path
+        self._st = st
+        self._ext = os.path.splitext(path)[1].lower() if path else ""
         self._update_display()
 
     def on_resize(self) -> None:
@@ -219,24 +278,27 @@ class _ContentViewer(Static):
             self.update(Text("No file selected.", style="dim"))
             return
 
-        if not os.path.exists(path):
-            self.update(Text.from_markup(f"[red]File not found:[/red] {path}"))
-            return
-
-        try:
-            st = os.stat(path)
-            mtime = datetime.datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M")
-            info = Text.from_markup(
-                f"[bold]Path:[/bold]     {path}\n"
-                f"[bold]Size:[/bold]     {_size_str(st.st_size)}\n"
-                f"[bold]Modified:[/bold] {mtime}\n"
-            )
-        except Exception as exc:
-            self.update(Text.from_markup(f"[red]Error:[/red] {exc}"))
-            return
+        # One stat covers both the existence check and the metadata; the
+        # scan-time stat passed via display_path avoids even that.
+        st = self._st
+        if st is None:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                self.update(Text.from_markup(f"[red]File not found:[/red] {path}"))
+                return
+            except Exception as exc:
+                self.update(Text.from_markup(f"[red]Error:[/red] {exc}"))
+                return
+        mtime = datetime.datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M")
+        info = Text.from_markup(
+            f"[bold]Path:[/bold]     {path}\n"
+            f"[bold]Size:[/bold]     {_size_str(st.st_size)}\n"
+            f"[bold]Modified:[/bold] {mtime}\n"
+        )
 
-        ext = os.path.splitext(path)[1].lower()
-        if ext in {".png", ".jpg", ".jpeg", ".tiff", ".bmp", ".gif", ".webp"}:
+        ext = self._ext
+        if ext in _IMAGE_EXTS:
             # content_size excludes border and padding — the true renderable area.
             # Only draw the image once we have a valid size (after first layout).
             w = self.content_size.width
@@ -249,10 +311,17 @@ class _ContentViewer(Static):
                 self.update(info)
             return
 
-        if ext in {".txt", ""}:
+        if ext in _TEXT_EXTS:
+            # Show only as many lines as fit below the metadata header,
+            # taken from a byte-bounded read: iterating lines alone would
+            # pull a newline-free file (minified JSON, one-line logs)
+            # whole into memory.
+            height = self.content_size.height
+            max_lines = max(height - 4, 1) if height > 0 else 64
             try:
                 with open(path, "r", encoding="utf-8", errors="replace") as f:
-                    content = f.read(8192)
+                    chunk = f.read(_TEXT_PREVIEW_CHARS)
+                content = "".join(chunk.splitlines(keepends=True)[:max_lines])
                 self.update(Group(info, Text(content)))
             except Exception as exc:
                 self.update(Group(info, Text.from_markup(f"[red]Cannot read:[/red] {exc}")))
@@ -303,14 +372,20 @@ class TuiApp(App):
         self._regex = regex
         self._base_path = base_path
         self._selection: dict = {}
+        self._panels_by_name: dict = {}
 
     def compose(self) -> ComposeResult:
         yield Header()
         options = self._index.get_options()
         self._selection = {k: v[0] for k, v in options.items() if v}
+        # Panels are registered by name as they are created; button presses
+        # then resolve their panel with a dict lookup instead of a DOM query.
+        self._panels_by_name = {}
         with Vertical(id="controls"):
             for param, values in options.items():
-                yield _ParamPanel(param, values, selected=self._selection.get(param))
+                panel = _ParamPanel(param, values, selected=self._selection.get(param))
+                self._panels_by_name[param] = panel
+                yield panel
         yield _ContentViewer()
         yield Footer()
 
@@ -326,7 +401,7 @@ class TuiApp(App):
         self._selection[param] = value
 
         # Update visual state of the clicked param's panel (no rebuild needed)
-        panel = self._get_panel(param)
+        panel = self._panels_by_name.get(param)
         if panel:
             panel.set_selected(value)
 
@@ -334,26 +409,26 @@ class TuiApp(App):
         self._update_options(changed_param=param)
         self._refresh_viewer()
 
-    def _get_panel(self, param: str) -> _ParamPanel | None:
-        for panel in self.query(_ParamPanel):
-            if panel._param_name == param:
-                return panel
-        return None
-
     def _update_options(self, changed_param: str) -> None:
         """Recompute and rebuild option buttons for every param except the one just changed."""
-        for panel in self.query(_ParamPanel):
-            param = panel._param_name
+        # One batch call instead of one exclusion dict + query per panel.
+        all_options = self._index.cross_filtered_options(self._selection)
+        for param, panel in self._panels_by_name.items():
             if param == changed_param:
                 continue
-            excl = {k: v for k, v in self._selection.items() if k != param}
-            new_opts = self._index.get_options(excl).get(param, [])
+            new_opts = all_options.get(param, [])
             if not new_opts:
                 continue
             current = self._selection.get(param, "")
             if current not in [str(o) for o in new_opts]:
                 current = str(new_opts[0])
                 self._selection[param] = current
+            if list(new_opts) == panel._options:
+                # Same option set as rendered: just sync the highlight and
+                # skip the remove/mount churn, which dominates reflow time.
+                if current != panel._selected:
+                    panel.set_selected(current)
+                continue
             panel.rebuild(new_opts, current)
 
     def _refresh_viewer(self) -> None:
@@ -363,7 +438,7 @@ class TuiApp(App):
             path = result if isinstance(result, str) else None
         except KeyError:
             path = None
-        viewer.display_path(path)
+        viewer.display_path(path, self._index.stat(path) if path else None)
 
     def action_rescan(self) -> None:
         self._index.refresh(self._regex, self._base_path)
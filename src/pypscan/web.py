@@ -4,17 +4,29 @@ Web UI backend for PyPScan.
 Starts a local HTTP server (stdlib only) and opens a browser tab.
 Supports inline image display and plain-text preview.
 """
-import base64
+import gzip
 import json
 import mimetypes
 import os
+import shutil
 import threading
 import webbrowser
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import parse_qs, urlparse
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote_plus
 
 from .core import Scanner, ParametricIndex
 
+try:
+    # orjson serializes straight to bytes in C; several-fold faster than
+    # stdlib json, which matters most for large base64 image payloads.
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:  # pragma: no cover
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data).encode()
+
+    _json_loads = json.loads
+
 _HTML_TEMPLATE = """\
 <!DOCTYPE html>
 <html lang="en">
@@ -81,25 +93,37 @@ _HTML_TEMPLATE = """\
 <script>
 const state = {};
 
-// Fetch cross-filtered options for all params given the current state.
-// The server computes per-param options with all other params fixed.
-async function fetchOptions() {
-  const resp = await fetch('/options?' + new URLSearchParams({state: JSON.stringify(state)}));
-  return resp.json();
+// One POST per interaction: the server returns cross-filtered options
+// and the file preview together, halving round-trips per click. The
+// body carries the selection plus a fingerprint per rendered row, so
+// the server can diff against exactly what this page displays.
+async function fetchClick() {
+  const resp = await fetch('/click', {
+    method: 'POST',
+    body: JSON.stringify({state: state, rendered: lastOpts}),
+  });
+  const data = await resp.json();
+  applyOptionsDiff(data.options);
+  if (data.file) renderFile(data.file);
 }
 
-async function fetchFile() {
-  if (!Object.keys(state).length) return;
-  const resp = await fetch('/file?' + new URLSearchParams({selection: JSON.stringify(state)}));
-  const data = await resp.json();
+function renderFile(data) {
   const viewer = document.getElementById('viewer');
   if (data.error) {
     viewer.innerHTML = `<span class="msg">${data.error}</span>`;
   } else if (data.type === 'image') {
-    viewer.innerHTML = `<img src="data:${data.mime};base64,${data.data}" alt="file">`;
+    // Point the <img> at the raw endpoint; the browser streams and
+    // decodes the bytes natively instead of unpacking base64 from JSON.
+    const img = document.createElement('img');
+    img.src = '/file-raw?' + new URLSearchParams({selection: JSON.stringify(state)});
+    img.alt = 'file';
+    viewer.innerHTML = '';
+    viewer.appendChild(img);
   } else if (data.type === 'text') {
     const pre = document.createElement('pre');
-    pre.textContent = data.data;
+    pre.textContent = data.truncated
+      ? data.data + '\n\n... [preview truncated]'
+      : data.data;
     viewer.innerHTML = '';
     viewer.appendChild(pre);
   } else {
@@ -110,24 +134,47 @@ async function fetchFile() {
 
 async function selectOption(param, value) {
   state[param] = value;
-  await updateControls();
-  await fetchFile();
+  await fetchClick();
 }
 
-async function updateControls() {
-  const allOptions = await fetchOptions();
+// Fingerprint of the option list each row was last rendered with; sent
+// with every /click as the server's diff baseline, and used locally to
+// skip rebuilding rows whose options did not actually change.
+const lastOpts = {};
+
+function applyOptionsDiff(diff) {
+  // The server diffs against the fingerprints this page sent: only rows
+  // in `changed` carry option lists, `unchanged` is just names.
   const controls = document.getElementById('controls');
   const existingGroups = {};
   controls.querySelectorAll('.param-group').forEach(g => {
     existingGroups[g.dataset.param] = g;
   });
 
-  for (const [param, opts] of Object.entries(allOptions)) {
+  for (const param of diff.unchanged || []) {
+    // Same options as rendered; only the highlight may have moved.
+    const group = existingGroups[param];
+    if (!group) continue;
+    group.querySelectorAll('button.opt').forEach(b => {
+      b.classList.toggle('active', b.textContent === state[param]);
+    });
+  }
+
+  for (const [param, opts] of Object.entries(diff.changed || {})) {
     // If current value is no longer valid, reset to first available.
     if (!opts.includes(state[param])) {
       state[param] = opts[0];
     }
     let group = existingGroups[param];
+    const key = opts.join('\x1f');
+    if (group && lastOpts[param] === key) {
+      // Same buttons already in the DOM; just move the highlight.
+      group.querySelectorAll('button.opt').forEach(b => {
+        b.classList.toggle('active', b.textContent === state[param]);
+      });
+      continue;
+    }
+    lastOpts[param] = key;
     if (!group) {
       group = document.createElement('div');
       group.className = 'param-group';
@@ -153,97 +200,298 @@ async function updateControls() {
   }
 }
 
-(async () => {
-  await updateControls();
-  await fetchFile();
-})();
+fetchClick();
 </script>
 </body>
 </html>
 """
 
 
+# Snapshot the stdlib MIME table once at import: guess_type lazy-parses the
+# OS mime files on first call and re-walks the path on every call, while the
+# per-request lookup below is splitext + one dict hit.
+_EXT_MIME = {ext.lower(): mime for ext, mime in mimetypes.types_map.items()}
+
+
+def _guess_mime(path: str) -> str:
+    return _EXT_MIME.get(
+        os.path.splitext(path)[1].lower(), "application/octet-stream"
+    )
+
+
+# Text previews are capped at this many characters; anything longer is cut
+# and flagged so the browser can say so.
+_TEXT_PREVIEW_LIMIT = 256 * 1024
+
+# Revisiting a file while flipping through parameters is the common browsing
+# pattern; previews are cached per content revision so a revisit never
+# re-reads the file. Override the size via PYPSCAN_FILE_CACHE_SIZE.
+_FILE_CACHE_SIZE = int(os.environ.get("PYPSCAN_FILE_CACHE_SIZE", "64"))
+
+
 def _file_response(path: str) -> dict:
     """Build a JSON-serialisable dict describing the file for the browser."""
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         return {"error": f"File not found: {path}"}
-    mime, _ = mimetypes.guess_type(path)
-    mime = mime or "application/octet-stream"
+    return _file_response_cached(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=_FILE_CACHE_SIZE)
+def _file_response_cached(path: str, mtime_ns: int, size: int) -> dict:
+    """_file_response body for one (path, mtime, size) content revision."""
+    mime = _guess_mime(path)
     if mime.startswith("image/"):
-        try:
-            with open(path, "rb") as f:
-                data = base64.b64encode(f.read()).decode()
-            return {"type": "image", "mime": mime, "data": data, "path": path}
-        except Exception as exc:
-            return {"error": str(exc)}
+        # The browser fetches the bytes itself from /file-raw and decodes
+        # them natively; no base64 round-trip through JSON.
+        return {"type": "image", "mime": mime, "path": path}
     if mime.startswith("text/") or path.lower().endswith(".txt"):
         try:
             with open(path, "r", encoding="utf-8", errors="replace") as f:
-                return {"type": "text", "data": f.read(), "path": path}
+                # Bound the preview: pointing the scanner at a multi-GiB log
+                # must not read it whole into RAM and ship it as JSON.
+                data = f.read(_TEXT_PREVIEW_LIMIT)
+                truncated = bool(f.read(1))
+            response = {"type": "text", "data": data, "path": path}
+            if truncated:
+                response["truncated"] = True
+            return response
         except Exception as exc:
             return {"error": str(exc)}
     return {"type": "other", "path": path}
 
 
 def _make_handler(index: ParametricIndex, html: str):
+    @lru_cache(maxsize=1024)
+    def options_map(state_items: tuple) -> dict:
+        """Cross-filtered option map for a canonicalized state tuple."""
+        # One batch call computes every parameter's leave-one-out options
+        # in a single pass over the index.
+        return index.cross_filtered_options(dict(state_items))
+
+    # The page body never changes; encode it once — and gzip it once (best
+    # ratio, it is paid a single time) — so a page load is a memcpy either
+    # way instead of a fresh UTF-8 encode per request.
+    html_bytes = html.encode()
+    html_gzip = gzip.compress(html_bytes, compresslevel=9)
+    html_content_type = "text/html; charset=utf-8"
+
     class Handler(BaseHTTPRequestHandler):
-        def log_message(self, fmt, *args):
+        # HTTP/1.1 keeps the TCP connection open between requests; every
+        # click fires /options then /file-meta, so this halves handshakes
+        # (and lets the /options diff below actually accumulate state).
+        protocol_version = "HTTP/1.1"
+        # TCP_NODELAY: without it, sub-kB JSON replies can sit in Nagle's
+        # buffer waiting on a delayed ACK — tens of ms of added click
+        # latency on non-loopback links. (SO_REUSEADDR is already on via
+        # HTTPServer.allow_reuse_address.)
+        disable_nagle_algorithm = True
+
+        def log_message(self, fmt: str, *args) -> None:
             pass  # silence request logging
 
-        def _send_json(self, data, code=200):
-            body = json.dumps(data).encode()
+        def _accepts_gzip(self) -> bool:
+            return "gzip" in self.headers.get("Accept-Encoding", "")
+
+        def _send_empty(self, code: int) -> None:
+            # Keep-alive requires a Content-Length on every response,
+            # including bodyless error replies.
+            self.send_response(code)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _send_body(
+            self,
+            body: bytes,
+            content_type: str,
+            code: int = 200,
+            encoding: str | None = None,
+        ) -> None:
             self.send_response(code)
-            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Type", content_type)
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
             self.send_header("Content-Length", str(len(body)))
             self.end_headers()
             self.wfile.write(body)
 
-        def do_GET(self):
-            parsed = urlparse(self.path)
-            qs = parse_qs(parsed.query)
-
-            if parsed.path == "/":
-                body = html.encode()
-                self.send_response(200)
-                self.send_header("Content-Type", "text/html; charset=utf-8")
-                self.send_header("Content-Length", str(len(body)))
-                self.end_headers()
-                self.wfile.write(body)
-
-            elif parsed.path == "/options":
-                # Receive full current state; return cross-filtered options:
-                # for each param, compute valid values with all OTHER params fixed.
-                raw = qs.get("state", ["{}"])[0]
-                try:
-                    state = json.loads(raw)
-                except json.JSONDecodeError:
-                    state = {}
-                result = {}
-                for param in index.all_params():
-                    excl = {k: v for k, v in state.items() if k != param}
-                    opts_map = index.get_options(excl)
-                    result[param] = opts_map.get(param, [])
-                self._send_json(result)
-
-            elif parsed.path == "/file":
-                raw = qs.get("selection", ["{}"])[0]
+        def _send_json_bytes(self, body: bytes, code: int = 200) -> None:
+            # Option lists compress 5-10x; level 1 keeps the CPU cost
+            # negligible and tiny payloads are not worth the header.
+            if len(body) >= 512 and self._accepts_gzip():
+                body = gzip.compress(body, compresslevel=1)
+                self._send_body(body, "application/json", code, encoding="gzip")
+            else:
+                self._send_body(body, "application/json", code)
+
+        def _send_json(self, data: dict, code: int = 200) -> None:
+            self._send_json_bytes(_json_dumps(data), code)
+
+        def _send_file_bytes(self, f, size: int) -> None:
+            """Copy *f* to the client, zero-copy via sendfile when possible."""
+            if hasattr(os, "sendfile"):
+                # Headers are buffered in wfile; push them out before
+                # writing to the raw socket fd.
+                self.wfile.flush()
+                out_fd = self.connection.fileno()
+                in_fd = f.fileno()
+                offset = 0
                 try:
-                    selection = json.loads(raw)
-                except json.JSONDecodeError:
+                    while offset < size:
+                        sent = os.sendfile(out_fd, in_fd, offset, 1 << 20)
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except OSError:
+                    if offset:
+                        raise  # partially sent; cannot restart cleanly
+                    # e.g. a filesystem that rejects sendfile: fall through.
+            shutil.copyfileobj(f, self.wfile, length=64 * 1024)
+
+        def _read_json_body(self) -> object:
+            """Parse the request body as JSON; None on any malformation."""
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except (TypeError, ValueError):
+                return None
+            if length <= 0:
+                return None
+            try:
+                return _json_loads(self.rfile.read(length))
+            except ValueError:
+                return None
+
+        @staticmethod
+        def _str_dict(data) -> dict:
+            """*data* as a dict with only its str-valued items (lenient)."""
+            if not isinstance(data, dict):
+                return {}
+            return {k: v for k, v in data.items() if isinstance(v, str)}
+
+        def _options_diff(self, state: dict, rendered: dict) -> dict:
+            """Cross-filtered options, diffed against the client's rows."""
+            # Interactive navigation revisits the same states over and
+            # over, so the option map is memoized per state. The diff
+            # baseline is the row fingerprints the page sends with each
+            # request: a typical click ships one or two value lists and
+            # the rest of the params travel as bare names in "unchanged".
+            # Keying the baseline to the client keeps it correct across
+            # page reloads and browsers spreading fetches over pooled
+            # keep-alive connections, which per-connection history is not.
+            opts = options_map(tuple(sorted(state.items())))
+            changed = {}
+            unchanged = []
+            for param, values in opts.items():
+                if rendered.get(param) == "\x1f".join(values):
+                    unchanged.append(param)
+                else:
+                    changed[param] = values
+            return {"changed": changed, "unchanged": unchanged}
+
+        def _file_meta(self, selection: dict) -> dict:
+            """Preview metadata for the file matching *selection*."""
+            try:
+                result = index.resolve(selection)
+            except KeyError:
+                return {"error": "No file matches the current selection."}
+            if isinstance(result, str):
+                return _file_response(result)
+            return {"error": "Ambiguous selection."}
+
+        def do_POST(self) -> None:
+            if self.path == "/click":
+                # One round-trip per interaction: cross-filtered options
+                # and the file preview in a single response, instead of
+                # sequential /options and /file-meta requests. The body
+                # carries the selection plus the fingerprints of the rows
+                # the page currently displays.
+                body = self._read_json_body()
+                if not isinstance(body, dict):
+                    body = {}
+                state = self._str_dict(body.get("state"))
+                rendered = self._str_dict(body.get("rendered"))
+                diff = self._options_diff(state, rendered)
+                # Fill missing params and snap stale values the way the
+                # page does, so the file half matches what ends up
+                # highlighted — on the initial empty-state load this
+                # selects the first value of every param, like the page
+                # itself will. Walk the full option map, not just the
+                # diff: on a reused connection unchanged rows carry no
+                # values but may still need filling.
+                opts = options_map(tuple(sorted(state.items())))
+                for param, values in opts.items():
+                    if values and state.get(param) not in values:
+                        state[param] = values[0]
+                file_meta = self._file_meta(state) if state else None
+                self._send_json({"options": diff, "file": file_meta})
+
+            elif self.path == "/options":
+                # Standalone endpoint: a bare selection body and no row
+                # fingerprints, so every param comes back in "changed".
+                state = self._str_dict(self._read_json_body())
+                self._send_json(self._options_diff(state, {}))
+
+            elif self.path == "/file-meta":
+                selection = self._read_json_body()
+                if not isinstance(selection, dict):
                     self._send_json({"error": "Bad selection."})
                     return
+                self._send_json(self._file_meta(selection))
+
+            else:
+                # Drain the unread body first: under keep-alive, leftover
+                # body bytes would be parsed as the next request line and
+                # desync every later exchange on this connection.
+                self._read_json_body()
+                self._send_empty(404)
+
+        def do_GET(self) -> None:
+            # Only two GET endpoints exist and /file-raw carries a single
+            # known query key; partition + unquote beats the generic
+            # urlparse/parse_qs machinery on every request.
+            path, _, query = self.path.partition("?")
+
+            if path == "/":
+                if self._accepts_gzip():
+                    self._send_body(html_gzip, html_content_type, encoding="gzip")
+                else:
+                    self._send_body(html_bytes, html_content_type)
+
+            elif path == "/file-raw":
+                if query.startswith("selection="):
+                    raw = unquote_plus(query[len("selection="):])
+                else:
+                    raw = "{}"
+                try:
+                    selection = _json_loads(raw)
+                except ValueError:
+                    selection = None
                 try:
-                    result = index.resolve(selection)
-                    if isinstance(result, str):
-                        self._send_json(_file_response(result))
-                    else:
-                        self._send_json({"error": "Ambiguous selection."})
+                    result = index.resolve(selection) if selection else None
                 except KeyError:
-                    self._send_json({"error": "No file matches the current selection."})
+                    result = None
+                if not isinstance(result, str):
+                    self._send_empty(404)
+                    return
+                try:
+                    f = open(result, "rb")
+                except OSError:
+                    self._send_empty(404)
+                    return
+                with f:
+                    size = os.fstat(f.fileno()).st_size
+                    self.send_response(200)
+                    self.send_header("Content-Type", _guess_mime(result))
+                    self.send_header("Content-Length", str(size))
+                    self.end_headers()
+                    # Kernel-space copy (or bounded chunks as fallback);
+                    # memory stays flat however large the image is.
+                    self._send_file_bytes(f, size)
 
             else:
-                self.send_response(404)
-                self.end_headers()
+                self._send_empty(404)
 
     return Handler
 
@@ -275,7 +523,10 @@ class WebPScan:
     def run(self):
         """Start the server and open the browser (blocking)."""
         handler = _make_handler(self._index, _HTML_TEMPLATE)
-        server = HTTPServer(("127.0.0.1", self.port), handler)
+        # Threading keeps /options responsive while a large /file-raw
+        # response is still streaming; index reads are side-effect free, so
+        # no locking is needed.
+        server = ThreadingHTTPServer(("127.0.0.1", self.port), handler)
         url = f"http://127.0.0.1:{self.port}/"
         print(f"PyPScan web UI: {url}  (Ctrl-C to stop)")
         threading.Timer(0.5, lambda: webbrowser.open(url)).start()